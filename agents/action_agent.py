@@ -1,54 +1,339 @@
 # agents/action_agent.py
 
 import re
+import json
+import logging
+import threading
 import webbrowser
 import os
+from concurrent.futures import ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Callable, Optional, Pattern
+
+from guardrails import is_allowed_action, validate_action
+
+# Seconds the chat turn waits for an action result before moving on. This only bounds
+# the wait: a handler that is already running is not interrupted and keeps its worker.
+DEFAULT_ACTION_TIMEOUT = 1.0
+# Search validation runs a zero-shot moderation inference, serialized across threads
+SEARCH_ACTION_TIMEOUT = 8.0
+DEFAULT_MAX_CONCURRENCY = 2    # concurrent runs allowed per action type
+DEFAULT_MAX_WORKERS = 4        # size of the shared action worker pool
+
+_FENCED_JSON = re.compile(r"```(?:json)?\s*(\{.*?\})\s*```", re.DOTALL | re.IGNORECASE)
+
+
+@dataclass
+class ActionSpec:
+    """
+    A registered action: how to recognise it, run it and bound it. `timeout` limits how
+    long the chat turn waits for the result, not how long the handler may run.
+    `max_concurrency` is enforced per spec across the whole process, so it is shared by
+    every agent and Streamlit session dispatching this spec.
+    """
+    name: str
+    handler: Optional[Callable[[dict], str]] = None
+    pattern: Optional[Pattern] = None
+    build_params: Optional[Callable[[re.Match], dict]] = None
+    normalize_params: Optional[Callable[[dict], dict]] = None
+    timeout: float = DEFAULT_ACTION_TIMEOUT
+    max_concurrency: int = DEFAULT_MAX_CONCURRENCY
+    limit: threading.BoundedSemaphore = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        self.limit = threading.BoundedSemaphore(self.max_concurrency)
+
+    def params_from_match(self, match: re.Match) -> dict:
+        if self.build_params is not None:
+            return self.build_params(match)
+        return {key: value.strip() for key, value in match.groupdict().items() if value is not None}
+
+    def prepare_params(self, params: dict) -> dict:
+        """Normalizes parameters from either the regex or the JSON tool-call path."""
+        if self.normalize_params is not None:
+            return self.normalize_params(params)
+        return params
+
+
+class ActionRegistry:
+    """Ordered collection of actions with their regex matchers compiled once."""
+
+    def __init__(self):
+        self._specs = {}
+
+    def register(self, name: str, handler: Callable[[dict], str], pattern: Optional[str] = None,
+                 build_params: Optional[Callable[[re.Match], dict]] = None,
+                 normalize_params: Optional[Callable[[dict], dict]] = None,
+                 timeout: float = DEFAULT_ACTION_TIMEOUT,
+                 max_concurrency: int = DEFAULT_MAX_CONCURRENCY) -> ActionSpec:
+        """
+        Registers an action. Free-text matching uses `pattern` (case-insensitive);
+        named groups become parameters unless `build_params` is given.
+        `normalize_params` is applied to the parameters of every dispatch, whichever
+        way the action was extracted.
+        Note that guardrails.validate_action still has to allow the action name.
+        """
+        spec = ActionSpec(
+            name=name,
+            handler=handler,
+            pattern=re.compile(pattern, re.IGNORECASE) if pattern else None,
+            build_params=build_params,
+            normalize_params=normalize_params,
+            timeout=timeout,
+            max_concurrency=max_concurrency,
+        )
+        self._specs[name] = spec
+        return spec
+
+    def copy(self) -> "ActionRegistry":
+        """Returns an independent registry with the same actions."""
+        registry = ActionRegistry()
+        registry._specs = dict(self._specs)
+        return registry
+
+    def get(self, name: str) -> Optional[ActionSpec]:
+        return self._specs.get(name)
+
+    def match(self, text: str) -> Optional[dict]:
+        """Returns the action details for the first registered pattern found in the text."""
+        for spec in self._specs.values():
+            if spec.pattern is None:
+                continue
+            match = spec.pattern.search(text)
+            if match:
+                return {"action": spec.name, "params": spec.params_from_match(match)}
+        return None
+
+
+class ActionExecutor:
+    """Bounded worker pool that runs actions off the chat thread, honouring each spec's limit."""
+
+    def __init__(self, max_workers: int = DEFAULT_MAX_WORKERS):
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="action-agent")
+
+    def submit(self, spec: ActionSpec, fn: Callable, *args):
+        """Schedules fn(*args); returns None if the spec is already at its concurrency limit."""
+        semaphore = spec.limit
+        if not semaphore.acquire(blocking=False):
+            return None
+        try:
+            future = self._pool.submit(fn, *args)
+        except Exception:
+            semaphore.release()
+            raise
+        # Released once the action finishes, fails or is cancelled before it started
+        future.add_done_callback(lambda _: semaphore.release())
+        return future
+
+
+def _simulate_search(params: dict) -> str:
+    query = params.get('query')
+    # This is a placeholder. In a real web app, you wouldn't use webbrowser.
+    # webbrowser.open(f"https://www.google.com/search?q={query}")
+    return f"[Action Agent] Simulating a search for: '{query}'. In a real app, this would open a new tab."
+
+
+def _simulate_open_file(params: dict) -> str:
+    filename = params.get('filename')
+    return f"[Action Agent] Simulating opening the file: '{filename}'. This is a restricted action in a web environment."
+
+
+def _normalize_filename(params: dict) -> dict:
+    filename = params.get('filename')
+    if not isinstance(filename, str):
+        return params
+    # Filenames are whitelisted in lower case by the guardrails
+    return {**params, 'filename': filename.strip('"\' `').lower()}
+
+
+def _build_default_registry() -> ActionRegistry:
+    registry = ActionRegistry()
+    registry.register(
+        "search", _simulate_search,
+        pattern=r"(?:search|open browser)(?: for)? (?P<query>.+)",
+        timeout=SEARCH_ACTION_TIMEOUT,
+    )
+    registry.register(
+        "open_file", _simulate_open_file,
+        pattern=r"open (?:the )?file (?P<filename>.+)",
+        normalize_params=_normalize_filename,
+    )
+    return registry
+
+
+# Template for new agents. Registering here adds an action for every agent and session.
+default_registry = _build_default_registry()
+
+_default_executor = None
+_default_executor_lock = threading.Lock()
+
+
+def get_default_executor() -> ActionExecutor:
+    """Returns the process-wide executor, shared across Streamlit reruns."""
+    global _default_executor
+    with _default_executor_lock:
+        if _default_executor is None:
+            _default_executor = ActionExecutor()
+        return _default_executor
+
 
 class ActionAgent:
-    def execute_action(self, response: str) -> str:
-        """Extracts and performs an action, returning a status message or None."""
+    def __init__(self, registry: Optional[ActionRegistry] = None, executor: Optional[ActionExecutor] = None):
+        self.registry = registry if registry is not None else default_registry.copy()
+        self.executor = executor if executor is not None else get_default_executor()
+
+    def register_action(self, name: str, handler: Callable[[dict], str], **kwargs) -> ActionSpec:
+        """
+        Adds an action to this agent's own registry only. Use default_registry.register
+        for actions every agent should have. See ActionRegistry.register. The new spec gets
+        its own concurrency limit, which applies process-wide to every dispatch of that spec.
+        """
+        return self.registry.register(name, handler, **kwargs)
+
+    def execute_action(self, response: str, pending: Optional[list] = None) -> str:
+        """
+        Extracts and performs an action, returning a status message or None.
+        If the action is still running after its timeout, it is appended to `pending`
+        so collect_results can report it later. The running handler is not stopped.
+        """
         action_details = self._extract_action(response)
-        
+
         if action_details["action"] == "unknown":
             return None # No action found, return None to indicate original response should be used
 
-        return self._perform_action(action_details)
+        action = action_details["action"]
+        # Reject disallowed or unregistered names here, so model output never takes a worker
+        is_allowed, reason = is_allowed_action(action)
+        if not is_allowed:
+            return f"[Action Agent] Action blocked by guardrails: {reason}"
+        spec = self.registry.get(action)
+        if spec is None or spec.handler is None:
+            return f"[Action Agent] Action '{action}' is recognized but not implemented."
+
+        future = self.executor.submit(spec, self._perform_action, action_details)
+        if future is None:
+            return f"[Action Agent] Action '{spec.name}' is busy. Please try again shortly."
+
+        # wait() rather than result(timeout=...): on Python 3.11+ a handler raising the
+        # built-in TimeoutError would otherwise look like the wait timing out
+        wait([future], timeout=spec.timeout)
+        if not future.done():
+            if future.cancel():
+                # Still queued behind other actions, so it never started
+                logging.warning(f"Action '{spec.name}' was not started within {spec.timeout}s and was cancelled.")
+                return f"[Action Agent] Action '{spec.name}' could not be started because all workers are busy. Please try again shortly."
+            if not future.done():
+                logging.warning(f"Action '{spec.name}' exceeded {spec.timeout}s and continues in the background.")
+                if pending is not None:
+                    pending.append((spec.name, future))
+                    return f"[Action Agent] Action '{spec.name}' is still running. Its result will appear in the chat shortly."
+                return f"[Action Agent] Action '{spec.name}' is still running in the background."
+
+        error = future.exception()
+        if error is not None:
+            return self._format_failure(spec.name, error)
+        return future.result()
+
+    @staticmethod
+    def collect_results(pending: list) -> list:
+        """Removes finished actions from `pending` and returns their status messages."""
+        results = []
+        for name, future in list(pending):
+            if not future.done():
+                continue
+            pending.remove((name, future))
+            if future.cancelled():
+                continue
+            error = future.exception()
+            results.append(ActionAgent._format_failure(name, error) if error else future.result())
+        return results
+
+    @staticmethod
+    def _format_failure(name: str, error: Exception) -> str:
+        logging.error(f"Error while performing action '{name}': {error}")
+        return f"[Action Agent] Action '{name}' failed: {error}"
 
     def _extract_action(self, response: str) -> dict:
-        """Extracts an action and its parameters from the response using regex."""
-        response = response.lower()
-        patterns = {
-            'search': r"(search|open browser)(?: for)? (.+)",
-            'open_file': r"open (?:the )?file (.+)",
-        }
-        
-        for action, pattern in patterns.items():
-            match = re.search(pattern, response)
-            if match:
-                if action == 'search':
-                    return {"action": action, "params": {"query": match.group(2).strip()}}
-                elif action == 'open_file':
-                    filename = match.group(1).strip('"\' `')
-                    return {"action": action, "params": {"filename": filename}}
-        
+        """Extracts an action from a JSON tool call, falling back to the registered regex patterns."""
+        action_details = self._extract_tool_call(response)
+        if action_details is not None:
+            return action_details
+
+        action_details = self.registry.match(response)
+        if action_details is not None:
+            return action_details
+
         return {"action": "unknown", "params": {}}
 
+    def _extract_tool_call(self, response: str) -> Optional[dict]:
+        """
+        Parses structured tool-call output such as {"action": "search", "params": {...}}
+        or {"name": "search", "arguments": {...}}, optionally inside a ```json fence.
+        """
+        fenced = _FENCED_JSON.search(response)
+        candidates = [fenced.group(1)] if fenced else []
+        stripped = response.strip()
+        if stripped.startswith("{"):
+            candidates.append(stripped)
+
+        for candidate in candidates:
+            try:
+                payload = json.loads(candidate)
+            except ValueError:
+                continue
+            if not isinstance(payload, dict):
+                continue
+            action, params = self._tool_call_fields(payload)
+            if action is None:
+                continue  # Plain JSON in a normal answer, not a tool call
+            if isinstance(params, str):
+                try:
+                    params = json.loads(params)
+                except ValueError:
+                    continue
+            if isinstance(action, str) and isinstance(params, dict):
+                return {"action": action.strip().lower(), "params": params}
+        return None
+
+    @staticmethod
+    def _tool_call_fields(payload: dict) -> (Optional[str], object):
+        """
+        Returns (action, params) when the payload is shaped like a tool call: an explicit
+        "action" key, a "function" wrapper, or a "name"/"tool" together with its arguments.
+        Otherwise returns (None, None).
+        """
+        if isinstance(payload.get("function"), dict):
+            payload = payload["function"]  # OpenAI-style {"function": {...}}
+            action = payload.get("name")
+        elif "action" in payload:
+            action = payload["action"]
+        elif any(key in payload for key in ("arguments", "params", "parameters")):
+            action = payload.get("name") or payload.get("tool")
+        else:
+            return None, None
+
+        for key in ("params", "arguments", "parameters"):
+            if key in payload:
+                return action, payload[key]
+        return action, {}
+
     def _perform_action(self, action_details: dict) -> str:
         """
-        Performs a validated action. For a web app, direct execution is a security risk.
-        This implementation returns descriptive messages instead of executing.
+        Validates and performs an action. For a web app, direct execution is a security risk,
+        so the built-in handlers return descriptive messages instead of executing.
         """
         action = action_details.get("action")
+        spec = self.registry.get(action)
         params = action_details.get("params", {})
-        
-        if action == "search":
-            query = params.get('query')
-            # This is a placeholder. In a real web app, you wouldn't use webbrowser.
-            # webbrowser.open(f"https://www.google.com/search?q={query}")
-            return f"[Action Agent] Simulating a search for: '{query}'. In a real app, this would open a new tab."
-        
-        elif action == "open_file":
-            filename = params.get('filename')
-            return f"[Action Agent] Simulating opening the file: '{filename}'. This is a restricted action in a web environment."
-
-        return f"[Action Agent] Action '{action}' is recognized but not implemented."
+        if spec is not None:
+            params = spec.prepare_params(params)
+            action_details = {"action": action, "params": params}
+
+        is_allowed, reason = validate_action(action_details)
+        if not is_allowed:
+            return f"[Action Agent] Action blocked by guardrails: {reason}"
+
+        if spec is None or spec.handler is None:
+            return f"[Action Agent] Action '{action}' is recognized but not implemented."
+
+        return spec.handler(params)
@@ -8,7 +8,7 @@ from agents.vision_agent import VisionAgent
 from agents.language_agent import LanguageAgent
 from agents.action_agent import ActionAgent
 from agents.text_moderation_agent import TextModerationAgent
-from guardrails import is_valid_image
+from guardrails import is_valid_image, warm_up_text_moderation
 
 # Load environment variables
 load_dotenv()
@@ -30,9 +30,19 @@ def initialize_session_state():
         st.session_state.image_info = ""
     if "messages" not in st.session_state:
         st.session_state.messages = []
+    if "pending_actions" not in st.session_state:
+        st.session_state.pending_actions = []
 
 initialize_session_state()
 
+@st.cache_resource(show_spinner="Loading moderation model...")
+def warm_up_guardrails():
+    # Loaded once per process so action validation fits within its timeout
+    warm_up_text_moderation()
+    return True
+
+warm_up_guardrails()
+
 # --- App Title ---
 st.title("Multi-Agent AI System")
 st.subheader("An AI-powered image analysis and conversational assistant with advanced guardrails")
@@ -73,6 +83,21 @@ if uploaded_file is not None:
 # --- Main Chat Interface ---
 st.header("Chat with the AI")
 
+# Surface results of actions that finished after their chat turn
+for action_result in ActionAgent.collect_results(st.session_state.pending_actions):
+    st.session_state.messages.append({"role": "assistant", "content": action_result})
+
+@st.fragment(run_every=2)
+def poll_pending_actions():
+    # Reruns on its own, so deferred results show up without a new message
+    if not st.session_state.pending_actions:
+        return
+    action_results = ActionAgent.collect_results(st.session_state.pending_actions)
+    if action_results:
+        for action_result in action_results:
+            st.session_state.messages.append({"role": "assistant", "content": action_result})
+        st.rerun()
+
 # Display conversation history
 for message in st.session_state.messages:
     with st.chat_message(message["role"]):
@@ -128,9 +153,12 @@ if prompt := st.chat_input("Ask about the image or start a new conversation...")
                     
                     # Check for and execute actions from the language model's response
                     action_agent = ActionAgent()
-                    action_response = action_agent.execute_action(response)
+                    action_response = action_agent.execute_action(response, st.session_state.pending_actions)
                     final_response = action_response if action_response else response
 
                 st.markdown(final_response)
                 # Add the assistant's response to the message history
                 st.session_state.messages.append({"role": "assistant", "content": final_response})
+
+# Called last so a rerun it triggers never cuts off the chat turn above
+poll_pending_actions()
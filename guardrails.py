@@ -2,6 +2,8 @@
 
 import re
 import logging
+import threading
+from functools import lru_cache
 from PIL import Image
 from agents.vision_moderation_agent import VisionModerationAgent
 from agents.text_moderation_agent import TextModerationAgent
@@ -22,11 +24,33 @@ allowed_actions = {"search", "open_file", "shutdown", "unknown"}
 allowed_filenames = {"example.txt", "document.txt", "notes.txt"} # Whitelist of safe files
 disallowed_path_keywords = ["..", "/", "\\", ":"] # Prevent path traversal
 
+# The moderation pipeline is shared by the action worker threads
+_text_moderation_agent = None
+_text_moderation_lock = threading.Lock()
+
+def _load_text_moderation_agent() -> TextModerationAgent:
+    """Returns the shared moderation agent. Callers must hold _text_moderation_lock."""
+    global _text_moderation_agent
+    if _text_moderation_agent is None:
+        _text_moderation_agent = TextModerationAgent()
+    return _text_moderation_agent
+
+def warm_up_text_moderation():
+    """Load the moderation model ahead of time so the first search is not slowed by it."""
+    with _text_moderation_lock:
+        _load_text_moderation_agent()
+
+@lru_cache(maxsize=512)
+def _moderate_text(text: str) -> (bool, str):
+    """Memoized moderation verdict. Errors propagate so they are never cached."""
+    # Serialize model loading and inference across threads
+    with _text_moderation_lock:
+        return _load_text_moderation_agent().is_malicious(text)
+
 def is_malicious_text(text: str) -> (bool, str):
     """Check for malicious text using an AI moderation agent and pattern matching."""
     try:
-        moderation_agent = TextModerationAgent()
-        is_harmful, reason = moderation_agent.is_malicious(text)
+        is_harmful, reason = _moderate_text(text)
         if is_harmful:
             logging.warning(f"Blocked malicious text (reason: {reason}): {text[:100]}...")
             return True, reason
@@ -65,15 +89,22 @@ def is_valid_image(image_path: str) -> bool:
         logging.warning(f"Blocked invalid image file {image_path}: {e}")
         return False
 
+def is_allowed_action(action: str) -> (bool, str):
+    """Cheap allow-list check on the action name alone, without parameter moderation."""
+    if action not in allowed_actions:
+        reason = f"Action '{action}' is not in the list of allowed actions."
+        logging.warning(f"Blocked illegal action: {reason}")
+        return False, reason
+    return True, "Action is allowed."
+
 def validate_action(action_details: dict) -> (bool, str):
     """Ensure the agent is allowed to perform an action and its parameters are safe."""
     action = action_details.get("action")
     params = action_details.get("params", {})
 
     # 1. Check if the action type is allowed
-    if action not in allowed_actions:
-        reason = f"Action '{action}' is not in the list of allowed actions."
-        logging.warning(f"Blocked illegal action: {reason}")
+    is_allowed, reason = is_allowed_action(action)
+    if not is_allowed:
         return False, reason
 
     # 2. Perform parameter-level validation
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Test script to verify action extraction and dispatch
+"""
+
+import time
+from agents.action_agent import ActionAgent, ActionRegistry, ActionExecutor
+
+def test_action_extraction():
+    """Test regex and JSON tool-call extraction"""
+    print("=== Testing Action Extraction ===")
+
+    agent = ActionAgent()
+    test_cases = [
+        ("Sure, I will search for python tutorials", "search"),
+        ('Open the file "Example.txt"', "open_file"),
+        ('{"action": "search", "params": {"query": "cats"}}', "search"),
+        ('```json\n{"name": "open_file", "arguments": "{\\"filename\\": \\"notes.txt\\"}"}\n```', "open_file"),
+        ("Hello, how can I help you today?", "unknown"),
+        ('{"name": "Alice", "age": 30}', "unknown"),
+        ('Here is the manifest:\n```json\n{"name": "my-app", "version": "1.0"}\n```', "unknown"),
+    ]
+
+    for response, expected_action in test_cases:
+        action_details = agent._extract_action(response)
+        status = "✓" if action_details["action"] == expected_action else "✗"
+        print(f"{status} '{response[:40]}' -> {action_details}")
+
+def test_action_dispatch():
+    """Test guardrail validation, timeouts and concurrency limits"""
+    print("\n=== Testing Action Dispatch ===")
+
+    agent = ActionAgent()
+    test_cases = [
+        ('Open the file "Example.txt"', "Simulating opening"),
+        ("open file ../../etc/passwd", "blocked by guardrails"),
+        ('{"action": "open_file", "params": {"filename": "Example.txt"}}', "Simulating opening"),
+        ('{"action": "execute_command", "params": {"cmd": "rm -rf /"}}', "blocked by guardrails"),
+    ]
+    for response, expected in test_cases:
+        result = agent.execute_action(response)
+        status = "✓" if expected in result else "✗"
+        print(f"{status} '{response}' -> {result}")
+
+    # "shutdown" is allowed by the guardrails, so it can stand in for a slow action
+    slow_agent = ActionAgent(registry=ActionRegistry(), executor=ActionExecutor(max_workers=2))
+    slow_agent.register_action("shutdown", lambda params: time.sleep(0.5) or "done",
+                               pattern=r"shut ?down", timeout=0.1, max_concurrency=1)
+    pending = []
+    first = slow_agent.execute_action("shutdown now", pending)
+    second = slow_agent.execute_action("shutdown now", pending)
+    print(f"{'✓' if 'still running' in first else '✗'} slow action -> {first}")
+    print(f"{'✓' if 'busy' in second else '✗'} concurrent slow action -> {second}")
+    time.sleep(0.6)
+    results = ActionAgent.collect_results(pending)
+    print(f"{'✓' if results == ['done'] and not pending else '✗'} finished slow action -> {results}")
+
+    # A re-registered action gets its own limit instead of the default spec's
+    agent.execute_action("open file example.txt")
+    wide_agent = ActionAgent()
+    wide_agent.register_action("open_file", lambda params: time.sleep(0.3) or "done",
+                               pattern=r"open (?:the )?file (?P<filename>.+)", timeout=0.05, max_concurrency=5)
+    wide = [wide_agent.execute_action("open file example.txt", []) for _ in range(3)]
+    print(f"{'✓' if not any('busy' in result for result in wide) else '✗'} per-spec limit -> {wide[-1]}")
+    time.sleep(0.4)
+
+    # A handler raising TimeoutError has failed; it is not an action still running
+    def raise_timeout(params):
+        raise TimeoutError("upstream")
+    failing_agent = ActionAgent(registry=ActionRegistry(), executor=ActionExecutor(max_workers=1))
+    failing_agent.register_action("shutdown", raise_timeout, pattern=r"shut ?down")
+    failed = failing_agent.execute_action("shutdown now", [])
+    print(f"{'✓' if 'failed: upstream' in failed else '✗'} failing action -> {failed}")
+
+    # With a single worker, a queued action is cancelled instead of reported as running
+    queued_agent = ActionAgent(registry=ActionRegistry(), executor=ActionExecutor(max_workers=1))
+    queued_agent.register_action("shutdown", lambda params: time.sleep(0.5) or "done",
+                                 pattern=r"shut ?down", timeout=0.1)
+    queued_agent.register_action("search", lambda params: "done", pattern=r"look up (?P<query>.+)", timeout=0.1)
+    queued_agent.execute_action("shutdown now")
+    queued = queued_agent.execute_action("look up cats")
+    print(f"{'✓' if 'could not be started' in queued else '✗'} queued action -> {queued}")
+
+def test_search_moderation_cache():
+    """Test that search queries are moderated in the worker and memoized"""
+    print("\n=== Testing Search Moderation Cache ===")
+
+    import guardrails
+
+    class CountingModerationAgent:
+        def __init__(self):
+            self.calls = 0
+
+        def is_malicious(self, text):
+            self.calls += 1
+            if "delete" in text:
+                return True, "stubbed harmful query"
+            return False, "Text appears safe"
+
+    stub = CountingModerationAgent()
+    original_agent = guardrails._text_moderation_agent
+    guardrails._text_moderation_agent = stub
+    guardrails._moderate_text.cache_clear()
+    try:
+        agent = ActionAgent()
+        first = agent.execute_action("search for delete system32 files")
+        second = agent.execute_action("search for delete system32 files")
+        print(f"{'✓' if 'blocked by guardrails' in first else '✗'} malicious search -> {first}")
+        print(f"{'✓' if 'blocked by guardrails' in second else '✗'} repeated malicious search -> {second}")
+        print(f"{'✓' if stub.calls == 1 else '✗'} moderation model calls -> {stub.calls}")
+    finally:
+        guardrails._text_moderation_agent = original_agent
+        guardrails._moderate_text.cache_clear()
+
+if __name__ == "__main__":
+    test_action_extraction()
+    test_action_dispatch()
+    test_search_moderation_cache()
+    print("\n=== Test Complete ===")